@@ -1,8 +1,8 @@
 import os
 import boto3
-from opensearchpy import OpenSearch, RequestsHttpConnection, AWSV4SignerAuth
+from opensearchpy import OpenSearch, RequestsHttpConnection, AWSV4SignerAuth, exceptions
 from dotenv import load_dotenv
-from utils import get_opensearch_client
+from utils import get_opensearch_client, bulk_index
 
 def main():
     # 1. Initialize Client
@@ -19,9 +19,13 @@ def main():
         info = client.info()
         print(f"✅ Connected to OpenSearch! Version: {info['version']['number']}")
     except Exception as e:
-        # Fallback for Serverless (AOSS) which returns 404 on root
+        # Fallback for Serverless (AOSS) which returns 404 on root.
+        # _cluster/health is an O(1) liveness probe, unlike cat.indices
+        # which returns the whole catalog.
         try:
-            client.cat.indices(format="json")
+            client.transport.perform_request(
+                'GET', '/_cluster/health', params={'timeout': '1s', 'local': 'true'}
+            )
             print("✅ Connected to OpenSearch Serverless (AOSS)!")
         except Exception as inner_e:
             print(f"❌ Connection failed: {e}")
@@ -49,33 +53,38 @@ def main():
         }
     }
 
+    # Create is idempotent: a duplicate create comes back as a specific
+    # error, so we skip the exists() probe round-trip (and its TOCTOU race).
     try:
-        if not client.indices.exists(index=index_name):
-            client.indices.create(index=index_name, body=index_body)
-            print(f"✅ Created index: {index_name}")
-        else:
-            print(f"ℹ️ Index {index_name} already exists.")
+        client.indices.create(index=index_name, body=index_body)
+        print(f"✅ Created index: {index_name}")
+    except exceptions.RequestError as e:
+        if getattr(e, 'error', '') != 'resource_already_exists_exception':
+            print(f"❌ Error creating index: {e}")
+            return
+        print(f"ℹ️ Index {index_name} already exists.")
     except Exception as e:
         print(f"❌ Error creating index: {e}")
         return
 
-    # 3. Insert Data
-    document = {
-        'name': 'MacBook Pro 16',
-        'category': 'Electronics',
-        'price': 2499.99,
-        'in_stock': True,
-        'description': 'Powerful laptop for creative professionals.'
-    }
+    # 3. Insert Data (bulk: one round-trip per chunk instead of per document)
+    documents = [
+        {
+            'name': 'MacBook Pro 16',
+            'category': 'Electronics',
+            'price': 2499.99,
+            'in_stock': True,
+            'description': 'Powerful laptop for creative professionals.'
+        }
+    ]
 
     try:
-        response = client.index(
-            index=index_name,
-            body=document
-        )
-        print(f"✅ Document inserted. Result: {response['result']}")
+        success, errors = bulk_index(client, index_name, documents)
+        print(f"✅ Bulk indexed {success} document(s).")
+        if errors:
+            print(f"⚠️ {len(errors)} document(s) failed: {errors[:3]}")
     except Exception as e:
-        print(f"❌ Error inserting document: {e}")
+        print(f"❌ Error inserting documents: {e}")
         return
 
     # 4. Verify by Searching
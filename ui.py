@@ -1,12 +1,63 @@
+import html
 import streamlit as st
+import string
 import time
 import pandas as pd
-from utils import get_opensearch_client, load_config
+from opensearchpy import exceptions
+from utils import get_opensearch_client, load_config, bulk_index, BULK_CHUNK_SIZE
 import os
 
 # Load config to ensure env vars are available
 load_config()
 
+@st.cache_resource
+def get_cached_client():
+    """Reuse one OpenSearch client (and its warm connection pool) across reruns."""
+    return get_opensearch_client()
+
+# Search-result card markup, compiled once at import. Rendered cards are
+# joined and emitted in a single st.markdown call so a page of results
+# costs one websocket delta instead of one per hit.
+_CARD_TMPL = string.Template("""
+<div style="padding: 1rem; background-color: white; border-radius: 8px; border: 1px solid #f0f0f0; margin-bottom: 1rem;">
+    <div style="display: flex; justify-content: space-between; align-items: center;">
+        <h4 style="margin: 0; color: #1f2937;">$name</h4>
+        <span style="background-color: #e0e7ff; color: #4338ca; padding: 0.2rem 0.6rem; border-radius: 999px; font-size: 0.8rem;">
+            $$$price
+        </span>
+    </div>
+    <p style="color: #6b7280; font-size: 0.9rem; margin-top: 0.5rem;">$description</p>
+    <div style="margin-top: 0.5rem; font-size: 0.8rem; color: #9ca3af;">
+        ID: $doc_id | Category: $category
+    </div>
+</div>
+""")
+
+@st.cache_data(ttl=30)
+def check_connection(_client):
+    """
+    Liveness probe, cached for 30s so widget interactions don't re-ping.
+    Returns ('provisioned', info) or ('serverless', None); raises when
+    the cluster is unreachable.
+    """
+    try:
+        return 'provisioned', _client.info()
+    except Exception:
+        # AOSS 404s on root; _cluster/health is an O(1) probe it permits,
+        # unlike cat.indices which returns the whole catalog.
+        _client.transport.perform_request(
+            'GET', '/_cluster/health', params={'timeout': '1s', 'local': 'true'}
+        )
+        return 'serverless', None
+
+@st.cache_data(ttl=30)
+def list_indices(_client):
+    """
+    Cache the index catalog for 30s so a rerun costs one round-trip
+    instead of one per tab. Cleared explicitly after index creation.
+    """
+    return _client.cat.indices(format="json")
+
 # Page Config
 st.set_page_config(
     page_title="OpenSearch Manager",
@@ -101,20 +152,15 @@ with st.sidebar:
     st.header("⚙️ Configuration")
     
     # Connection Status Indicator
-    client = get_opensearch_client()
+    client = get_cached_client()
     if client:
         try:
-            # Try basic info first (works for Provisioned)
-            # For Serverless (AOSS), root '/' might 404, so we fallback to listing indices logic or just 'ping'
-            try:
-                info = client.info()
+            mode, info = check_connection(client)
+            if mode == 'provisioned':
                 st.success("🟢 Connected to OpenSearch (Provisioned)")
                 with st.expander("Cluster Info"):
                     st.json(info)
-            except Exception:
-                # Fallback for AOSS which may not return info() cleanly or returns 404 on root
-                # Try listing indices as a "ping"
-                client.cat.indices(format="json") 
+            else:
                 st.success("🟢 Connected to OpenSearch (Serverless)")
         except Exception as e:
             st.error("🔴 Connection Failed")
@@ -145,21 +191,26 @@ with tabs[0]:
     if client:
         try:
             # Get Indexes
-            indices = client.cat.indices(format="json")
-            
+            indices = list_indices(client)
+
+            # Build the frame once; the doc-count total is a single C-level
+            # column reduction and the same df feeds the table below.
+            df = pd.DataFrame(indices)
+            total_docs = 0
+            if 'docs.count' in df:
+                total_docs = int(pd.to_numeric(df['docs.count'], errors='coerce').fillna(0).astype('int64').sum())
+
             # Key Metrics
             m1, m2, m3 = st.columns(3)
             with m1:
                 st.metric("Total Indexes", len(indices))
             with m2:
-                total_docs = sum([int(i.get('docs.count', 0)) for i in indices])
                 st.metric("Total Documents", total_docs)
             with m3:
                 st.metric("Status", "Healthy", delta="Online")
 
             st.markdown("### 🗂️ Active Indexes")
             if indices:
-                df = pd.DataFrame(indices)
                 st.dataframe(
                     df[['index', 'health', 'status', 'docs.count', 'store.size']],
                     use_container_width=True,
@@ -182,25 +233,29 @@ with tabs[0]:
                     create_submitted = st.form_submit_button("Create Index", type="primary")
                 
                 if create_submitted and new_index_name:
-                    try:
-                        if not client.indices.exists(index=new_index_name):
-                            # Basic settings/mappings
-                            body = {
-                                'settings': {'index': {'number_of_shards': 1, 'number_of_replicas': 1}},
-                                'mappings': {
-                                    'properties': {
-                                        'name': {'type': 'text'},
-                                        'category': {'type': 'keyword'},
-                                        'created_at': {'type': 'date'}
-                                    }
-                                }
+                    # Basic settings/mappings
+                    body = {
+                        'settings': {'index': {'number_of_shards': 1, 'number_of_replicas': 1}},
+                        'mappings': {
+                            'properties': {
+                                'name': {'type': 'text'},
+                                'category': {'type': 'keyword'},
+                                'created_at': {'type': 'date'}
                             }
-                            client.indices.create(index=new_index_name, body=body)
-                            st.success(f"Index `{new_index_name}` created successfully!")
-                            time.sleep(1)
-                            st.rerun()
-                        else:
+                        }
+                    }
+                    # Single idempotent create: no exists() probe round-trip
+                    try:
+                        client.indices.create(index=new_index_name, body=body)
+                        list_indices.clear()
+                        st.success(f"Index `{new_index_name}` created successfully!")
+                        time.sleep(1)
+                        st.rerun()
+                    except exceptions.RequestError as e:
+                        if getattr(e, 'error', '') == 'resource_already_exists_exception':
                             st.warning(f"Index `{new_index_name}` already exists.")
+                        else:
+                            st.error(f"Creation failed: {e}")
                     except Exception as e:
                         st.error(f"Creation failed: {e}")
 
@@ -212,13 +267,18 @@ with tabs[0]:
 # --- Tab 2: Data Entry (Insert Documents) ---
 with tabs[1]:
     st.subheader("📝 Add Data")
-    
+
+    # Buffer form submissions so we hit the _bulk API instead of one
+    # HTTPS round-trip per document.
+    if "pending_docs" not in st.session_state:
+        st.session_state["pending_docs"] = []
+
     if client:
         try:
-            indices_list = [i['index'] for i in client.cat.indices(format="json")]
+            indices_list = [i['index'] for i in list_indices(client)]
         except:
             indices_list = []
-            
+
         if not indices_list:
             st.warning("No indexes available. Create one in the Dashboard tab first.")
         else:
@@ -236,8 +296,8 @@ with tabs[1]:
                 
                 description = st.text_area("Description", placeholder="Product details...")
                 
-                submitted = st.form_submit_button("Insert Document", type="primary")
-                
+                submitted = st.form_submit_button("Add to Batch", type="primary")
+
                 if submitted:
                     doc = {
                         'name': name,
@@ -247,13 +307,24 @@ with tabs[1]:
                         'description': description,
                         'created_at': time.strftime("%Y-%m-%dT%H:%M:%SZ")
                     }
-                    
-                    try:
-                        resp = client.index(index=selected_index, body=doc)
-                        st.balloons()
-                        st.success(f"Document added! ID: `{resp['_id']}`")
-                    except Exception as e:
-                        st.error(f"Insert failed: {e}")
+                    st.session_state["pending_docs"].append(doc)
+
+            # Batch status + flush controls (outside the form so the button works standalone)
+            pending = st.session_state["pending_docs"]
+            auto_flush = len(pending) >= BULK_CHUNK_SIZE
+            if pending:
+                st.info(f"📦 {len(pending)} document(s) pending (auto-flush at {BULK_CHUNK_SIZE}).")
+
+            if (pending and st.button("Flush Batch", type="primary")) or auto_flush:
+                try:
+                    success, errors = bulk_index(client, selected_index, pending)
+                    st.session_state["pending_docs"] = []
+                    st.balloons()
+                    st.success(f"Bulk indexed {success} document(s)!")
+                    if errors:
+                        st.warning(f"{len(errors)} document(s) failed: {errors[:3]}")
+                except Exception as e:
+                    st.error(f"Bulk insert failed: {e}")
     else:
         st.info("Connect to OpenSearch first.")
 
@@ -263,7 +334,7 @@ with tabs[2]:
     
     if client:
         try:
-            indices_list = [i['index'] for i in client.cat.indices(format="json")]
+            indices_list = [i['index'] for i in list_indices(client)]
             s_index = st.selectbox("Search in Index", indices_list, key="search_idx")
         except:
             indices_list = []
@@ -273,39 +344,44 @@ with tabs[2]:
         
         if search_query and s_index:
             try:
-                # Simple Match Query
+                # bool_prefix matches as-you-type; size/_source/total caps
+                # keep the response small no matter how big the index gets.
                 query = {
                     "query": {
                         "multi_match": {
                             "query": search_query,
+                            "type": "bool_prefix",
                             "fields": ["name^2", "description", "category"]
                         }
-                    }
+                    },
+                    "size": 20,
+                    "_source": ["name", "price", "description", "category"],
+                    "track_total_hits": 50
                 }
-                
-                res = client.search(index=s_index, body=query)
-                hits = res['hits']['hits']
-                count = res['hits']['total']['value']
+
+                res = client.search(
+                    index=s_index,
+                    body=query,
+                    filter_path="hits.hits._source,hits.hits._id,hits.total"
+                )
+                hits = res.get('hits', {}).get('hits', [])
+                count = res.get('hits', {}).get('total', {}).get('value', 0)
                 
                 st.markdown(f"**Found {count} results**")
                 
-                for hit in hits:
-                    source = hit['_source']
-                    with st.container():
-                        st.markdown(f"""
-                        <div style="padding: 1rem; background-color: white; border-radius: 8px; border: 1px solid #f0f0f0; margin-bottom: 1rem;">
-                            <div style="display: flex; justify-content: space-between; align-items: center;">
-                                <h4 style="margin: 0; color: #1f2937;">{source.get('name', 'Unknown')}</h4>
-                                <span style="background-color: #e0e7ff; color: #4338ca; padding: 0.2rem 0.6rem; border-radius: 999px; font-size: 0.8rem;">
-                                    ${source.get('price', 0)}
-                                </span>
-                            </div>
-                            <p style="color: #6b7280; font-size: 0.9rem; margin-top: 0.5rem;">{source.get('description', '')}</p>
-                            <div style="margin-top: 0.5rem; font-size: 0.8rem; color: #9ca3af;">
-                                ID: {hit['_id']} | Category: {source.get('category')}
-                            </div>
-                        </div>
-                        """, unsafe_allow_html=True)
+                # One markdown call for the whole page; escape source
+                # fields since we render with unsafe_allow_html.
+                cards = "".join(
+                    _CARD_TMPL.substitute(
+                        name=html.escape(str(hit['_source'].get('name', 'Unknown'))),
+                        price=html.escape(str(hit['_source'].get('price', 0))),
+                        description=html.escape(str(hit['_source'].get('description', ''))),
+                        doc_id=html.escape(str(hit['_id'])),
+                        category=html.escape(str(hit['_source'].get('category')))
+                    )
+                    for hit in hits
+                )
+                st.markdown(cards, unsafe_allow_html=True)
 
             except Exception as e:
                 st.error(f"Search error: {e}")